@@ -38,6 +38,16 @@ import json
     default="auroc",
     help="what to early stop on. Options are: auroc, auprc, auprc+auroc, or loss",
 )
+@click.option(
+    "--val_every",
+    default=1,
+    help="run the validation pass every this many epochs",
+)
+@click.option(
+    "--compile_model",
+    default=True,
+    help="boolean, run the model through torch.compile; set to False for eager execution",
+)
 @click.option("--seft_n_phi_layers", default=3)
 @click.option("--seft_phi_width", default=32)
 @click.option("--seft_phi_dropout", default=0.)
@@ -65,6 +75,8 @@ def core_function(
     lr,
     patience,
     early_stop_criteria,
+    val_every,
+    compile_model,
     **kwargs
 ):
 
@@ -74,6 +86,15 @@ def core_function(
     random.seed(0)
     np.random.seed(0)
 
+    # under torchrun every rank runs this function; rank 0 prepares the
+    # output folders and the preprocessed dataset cache while the other
+    # ranks wait at a barrier, then read the cache it produced
+    distributed = int(os.environ.get("WORLD_SIZE", "1")) > 1
+    if distributed and not torch.distributed.is_initialized():
+        torch.distributed.init_process_group("nccl")
+        torch.cuda.set_device(int(os.environ.get("LOCAL_RANK", "0")))
+    is_main = (not distributed) or torch.distributed.get_rank() == 0
+
     accum_loss = []
     accum_accuracy = []
     accum_auprc = []
@@ -82,25 +103,34 @@ def core_function(
     for split_index in range(1, 6):
 
         base_path_new = f"{base_path}/split_{split_index}"
-        train_pair, val_data, test_data = load_pad_separate(
-            dataset_id, base_path_new, split_index
-        )
-
-        # make necessary folders
-        # if new model, make model folder
-        if os.path.exists(output_path):
-            pass
-        else:
-            try:
-                os.mkdir(output_path)
-            except OSError as err:
-                print("OS error:", err)
-        # make run folder
         base_run_path = os.path.join(output_path, f"split_{split_index}")
         run_path = base_run_path
-        if os.path.exists(run_path):
-            raise ValueError(f"Path {run_path} already exists.")
-        os.mkdir(run_path)
+
+        if is_main:
+            train_pair, val_data, test_data = load_pad_separate(
+                dataset_id, base_path_new, split_index
+            )
+
+            # make necessary folders
+            # if new model, make model folder
+            if os.path.exists(output_path):
+                pass
+            else:
+                try:
+                    os.mkdir(output_path)
+                except OSError as err:
+                    print("OS error:", err)
+            # make run folder
+            if os.path.exists(run_path):
+                raise ValueError(f"Path {run_path} already exists.")
+            os.mkdir(run_path)
+        if distributed:
+            torch.distributed.barrier()
+        if not is_main:
+            # rank 0 has preprocessed and cached the split, so this is a pure load
+            train_pair, val_data, test_data = load_pad_separate(
+                dataset_id, base_path_new, split_index
+            )
 
         # save model settings
         model_settings = {
@@ -140,8 +170,9 @@ def core_function(
             model_settings["ipnets_imputation_stepsize"] = model_args["ipnets_imputation_stepsize"]
             model_settings["ipnets_reconst_fraction"] = model_args["ipnets_reconst_fraction"]
 
-        with open(f"{run_path}/model_settings.json", "w") as fp:
-            json.dump(model_settings, fp)
+        if is_main:
+            with open(f"{run_path}/model_settings.json", "w") as fp:
+                json.dump(model_settings, fp)
 
         # run training
         loss, accuracy_score, auprc_score, auc_score = train_test(
@@ -155,6 +186,8 @@ def core_function(
             lr=lr,
             patience=patience,
             early_stop_criteria=early_stop_criteria,
+            val_every=val_every,
+            compile_model=compile_model,
             model_args=model_args,
         )
 
@@ -163,6 +196,9 @@ def core_function(
         accum_auprc.append(auprc_score)
         accum_auroc.append(auc_score)
 
+    if not is_main:
+        return
+
     with open(f"{output_path}/summary.json", "w") as f:
         json.dump(
             {
@@ -1,15 +1,17 @@
 import logging
+import os
+import queue
+import threading
 
 import torch
 import numpy as np
-import matplotlib.pyplot as plt
 import tqdm
 from torch.utils.data import DataLoader
 from torch import nn
 from sklearn import metrics
 import json
 import pandas as pd
-from mortality_part_preprocessing import PairedDataset, MortalityDataset
+from mortality_part_preprocessing import PairedDataset, MortalityDataset, LengthBucketBatchSampler
 from models.regular_transformer import EncoderClassifierRegular
 from models.early_stopper import EarlyStopping
 from models.deep_set_attention import DeepSetAttentionModel
@@ -17,6 +19,85 @@ from models.grud import GRUDModel
 from models.ip_nets import InterpolationPredictionModel
 from models.mamba_P12 import CustomMambaModel
 
+# size the dataloader worker pool to the host instead of hardcoding 16:
+# workers past the storage bandwidth ceiling only cost memory and context
+# switches, and on a multi-GPU box each process gets its share of the cores
+NUM_WORKERS = max(1, min(8, (os.cpu_count() or 8) // max(1, torch.cuda.device_count())))
+
+
+class CudaBatchPrefetcher:
+    """
+    Iterates a DataLoader on a background thread and stages each batch on the
+    GPU ahead of time.
+    The worker thread performs the host-to-device copies on a dedicated CUDA
+    stream (non_blocking, from the pinned dataloader buffers) and pushes the
+    ready batches onto a small bounded queue, so data loading and transfer
+    overlap with the compute of the previous step. The consuming thread makes
+    the default stream wait on the copy stream before handing a batch out,
+    which keeps the usual ordering guarantees.
+    """
+
+    def __init__(self, dataloader, device, queue_depth=2):
+        self.dataloader = dataloader
+        self.device = device
+        self.queue_depth = queue_depth
+        self.copy_stream = torch.cuda.Stream(device=device)
+
+    def __len__(self):
+        return len(self.dataloader)
+
+    def __iter__(self):
+        batch_queue = queue.Queue(maxsize=self.queue_depth)
+        sentinel = object()
+        abandoned = threading.Event()
+
+        def _put(item):
+            # bounded put that gives up if the consumer stopped iterating,
+            # so an abandoned epoch never leaves the worker blocked on put()
+            while not abandoned.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _worker():
+            try:
+                for batch in self.dataloader:
+                    with torch.cuda.stream(self.copy_stream):
+                        batch = tuple(
+                            t.to(self.device, non_blocking=True) for t in batch
+                        )
+                    if not _put(batch):
+                        return
+            except BaseException as exc:  # surface loader errors on the main thread
+                _put(exc)
+            else:
+                _put(sentinel)
+
+        worker = threading.Thread(target=_worker, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = batch_queue.get()
+                if item is sentinel:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                # make sure the async copies finished before compute uses the batch
+                torch.cuda.current_stream().wait_stream(self.copy_stream)
+                # the tensors were allocated on copy_stream; record their use on
+                # the consumer stream so the caching allocator cannot hand their
+                # memory back to the next batch's copies while queued kernels
+                # are still reading them
+                for t in item:
+                    t.record_stream(torch.cuda.current_stream())
+                yield item
+        finally:
+            abandoned.set()
+            worker.join()
+
 
 def train_test(
     train_pair,
@@ -29,7 +110,9 @@ def train_test(
     epochs=300,
     patience=5,
     lr=0.0001,
-    early_stop_criteria="auroc"
+    early_stop_criteria="auroc",
+    compile_model=True,
+    val_every=1,
 ):
 
     train_batch_size = batch_size // 2  # we concatenate 2 batches together
@@ -37,9 +120,27 @@ def train_test(
     train_collate_fn = PairedDataset.paired_collate_fn_truncate
     val_test_collate_fn = MortalityDataset.non_pair_collate_fn_truncate
 
-    train_dataloader = DataLoader(train_pair, train_batch_size, shuffle=True, num_workers=16, collate_fn=train_collate_fn, pin_memory=True)
-    test_dataloader = DataLoader(test_data, batch_size, shuffle=True, num_workers=16, collate_fn=val_test_collate_fn, pin_memory=True)
-    val_dataloader = DataLoader(val_data, batch_size, shuffle=False, num_workers=16, collate_fn=val_test_collate_fn, pin_memory=True)
+    # when launched with torchrun, shard the training batches across ranks
+    # and train with DistributedDataParallel; single-process runs see
+    # world_size == 1 and behave exactly as before
+    distributed = int(os.environ.get("WORLD_SIZE", "1")) > 1
+    if distributed and not torch.distributed.is_initialized():
+        torch.distributed.init_process_group("nccl")
+        torch.cuda.set_device(int(os.environ.get("LOCAL_RANK", "0")))
+    world_size = torch.distributed.get_world_size() if distributed else 1
+    rank = torch.distributed.get_rank() if distributed else 0
+
+    # bucket batches by real sequence length so the truncating collates pad
+    # each batch only to its own longest member instead of the global max
+    train_batch_sampler = LengthBucketBatchSampler(train_pair.sequence_lengths(), train_batch_size, shuffle=True, num_replicas=world_size, rank=rank)
+    test_batch_sampler = LengthBucketBatchSampler(test_data.sequence_lengths(), batch_size, shuffle=True)
+    val_batch_sampler = LengthBucketBatchSampler(val_data.sequence_lengths(), batch_size, shuffle=False)
+
+    # persistent_workers keeps the worker pool alive across epochs instead of
+    # re-forking it; a modest prefetch_factor is enough without risking OOM
+    train_dataloader = DataLoader(train_pair, batch_sampler=train_batch_sampler, num_workers=NUM_WORKERS, collate_fn=train_collate_fn, pin_memory=True, persistent_workers=True, prefetch_factor=4)
+    test_dataloader = DataLoader(test_data, batch_sampler=test_batch_sampler, num_workers=NUM_WORKERS, collate_fn=val_test_collate_fn, pin_memory=True, persistent_workers=True, prefetch_factor=4)
+    val_dataloader = DataLoader(val_data, batch_sampler=val_batch_sampler, num_workers=min(NUM_WORKERS, 4), collate_fn=val_test_collate_fn, pin_memory=True, persistent_workers=True, prefetch_factor=4)
 
     # assign GPU
     if torch.cuda.is_available():
@@ -50,6 +151,14 @@ def train_test(
         dev = "cpu"
     device = torch.device(dev)
 
+    if dev == "cuda":
+        # batch shapes are bounded by the dataset max length, so letting
+        # cuDNN benchmark algorithms once pays off over thousands of steps;
+        # TF32 speeds up the fp32 matmuls in the dense layers on Ampere+
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.set_float32_matmul_precision("high")
+
     val_loss, model = train(
         train_dataloader=train_dataloader,
         val_dataloader=val_dataloader,
@@ -61,7 +170,9 @@ def train_test(
         batch_size=batch_size,
         lr=lr,
         early_stop_criteria=early_stop_criteria,
-        model_args=model_args
+        model_args=model_args,
+        compile_model=compile_model,
+        val_every=val_every,
     )
 
     loss, accuracy_score, auprc_score, auc_score = test(
@@ -88,7 +199,9 @@ def train(
     lr,
     early_stop_criteria,
     model_args,
-    **kwargs,  
+    compile_model=True,
+    val_every=1,
+    **kwargs,
 ):
     """
         Trains a deep learning model for mortality classification.
@@ -103,6 +216,8 @@ def train(
         lr (float): Learning rate for the optimizer.
         early_stop_criteria (str): Criteria for early stopping ('auroc', 'auprc', 'auprc+auroc', 'loss').
         model_args (dict): Additional arguments for the model.
+        compile_model (bool): If True, run the model through torch.compile; set to False for eager execution.
+        val_every (int): Run the validation pass every val_every epochs (always within the final patience window).
         **kwargs: Additional keyword arguments.
     Returns:
         tuple: Validation loss and the trained model.
@@ -120,31 +235,32 @@ def train(
     7. Returns the final validation loss and the trained model.
     """
 
-    iterable_inner_dataloader = iter(train_dataloader) # make the train_dataloader iterable
-    test_batch = next(iterable_inner_dataloader) # iterate on the next object in a tuple
-    max_seq_length = test_batch[0].shape[2] # shape[2] = T
-    sensor_count = test_batch[0].shape[1] # shape[1] = F
-    static_size = test_batch[2].shape[1] # shape[1] = 8
+    # read the shapes from the dataset metadata instead of loading (and then
+    # discarding) a whole first batch just to probe them
+    train_dataset = train_dataloader.dataset
+    max_seq_length = train_dataset.max_seq_length # T
+    sensor_count = train_dataset.sensor_count # F
+    static_size = train_dataset.static_size # 8
 
-    # dim(test_batch[0]) = (N, F, T) values
-    # dim(test_batch[1]) = (N, T) time
-    # dim(test_batch[2]) = (N, S = 8) static attrinutes
-    # dim(test_batch[3]) = (N) labels
-    # dim(test_batch[4]) = (N, F, T) mask
-    # dim(test_batch[5]) = (N, F, T) delta
+    # dim(batch[0]) = (N, F, T) values
+    # dim(batch[1]) = (N, T) time
+    # dim(batch[2]) = (N, S = 8) static attrinutes
+    # dim(batch[3]) = (N) labels
+    # dim(batch[4]) = (N, F, T) mask
+    # dim(batch[5]) = (N, F, T) delta
 
     # make a new model and train
     if model_type == "grud":
         model = GRUDModel(
             input_dim=sensor_count,
             static_dim=static_size,
-            output_dims=2, # mortality or not mortality
+            output_dims=1, # single mortality logit
             device=device,
             **model_args
         )
     elif model_type == "ipnets":
         model = InterpolationPredictionModel(
-            output_dims=2,
+            output_dims=1,
             sensor_count=sensor_count,
             **model_args
         )
@@ -152,12 +268,12 @@ def train(
         model = DeepSetAttentionModel(
             output_activation=None,
             n_modalities=sensor_count,
-            output_dims=2,
+            output_dims=1,
             **model_args
         )
     elif model_type == "transformer":
         model = EncoderClassifierRegular(
-            num_classes=2,
+            num_classes=1,
             device=device,
             max_timepoint_count=max_seq_length,
             sensors_count=sensor_count,
@@ -168,7 +284,7 @@ def train(
     elif model_type == "mamba":
         model = CustomMambaModel(
             max_seq_length=max_seq_length,
-            num_classes=2,
+            num_classes=1,
             static_size=static_size,
             sensor_count=sensor_count,
             **model_args
@@ -176,118 +292,190 @@ def train(
     model_parameters = filter(lambda p: p.requires_grad, model.parameters())
     params = sum([np.prod(p.size()) for p in model_parameters])
     print(f"# of trainable parameters: {params}")
-    criterion = nn.CrossEntropyLoss()  # loss
+
+    # under torchrun each rank trains on its shard of the bucketed batches
+    # and DDP keeps the replicas in sync; only rank 0 touches the filesystem
+    distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+    rank = torch.distributed.get_rank() if distributed else 0
+    is_main = rank == 0
+    if distributed:
+        model = nn.parallel.DistributedDataParallel(
+            model.to(device), device_ids=[torch.cuda.current_device()]
+        )
+
+    # compile the model for steady-state speed; dynamic=True because the
+    # truncating collate gives every batch its own sequence length. Set
+    # compile_model=False to fall back to eager execution.
+    if compile_model and hasattr(torch, "compile"):
+        model = torch.compile(model, mode="reduce-overhead", dynamic=True)
+
+    # a 2-class softmax is equivalent to a single-logit sigmoid; the binary
+    # loss halves the classifier head and uses a fused sigmoid-NLL kernel
+    criterion = nn.BCEWithLogitsLoss()  # loss
     optimizer = torch.optim.Adam(
         model.parameters(), lr=lr
     )
-
-    early_stopping = EarlyStopping(
-        patience=patience, verbose=True, path=f"{output_path}/checkpoint.pt"
-    )  # set up early stopping
-
-    # initialize results file
-    with open(f"{output_path}/training_log.csv", "w") as train_log:
-        train_log.write(
-            ",".join(["epoch", "train_loss", "val_loss", "val_roc_auc_score"]) + "\n"
-        )
+    # bf16 autocast halves activation memory traffic and enables tensor cores;
+    # unlike fp16 it needs no GradScaler. CPU/MPS and pre-Ampere GPUs
+    # (no hardware bf16) keep the fp32 path.
+    use_amp = device.type == "cuda" and torch.cuda.is_bf16_supported()
+
+    # only rank 0 tracks early stopping and writes the checkpoint; its stop
+    # decision is broadcast after each validation epoch, so per-rank numeric
+    # differences (e.g. cudnn.benchmark algorithm choices) cannot make the
+    # ranks disagree on stopping and deadlock the next all-reduce
+    early_stopping = None
+    if is_main:
+        early_stopping = EarlyStopping(
+            patience=patience, verbose=True, path=f"{output_path}/checkpoint.pt"
+        )  # set up early stopping
+
+    # initialize results file; keep one handle open for the whole run instead
+    # of reopening the file every epoch
+    log_columns = ["epoch", "train_loss", "val_loss", "val_roc_auc_score"]
+    train_log = open(f"{output_path}/training_log.csv", "w") if is_main else None
+    if train_log:
+        train_log.write(",".join(log_columns) + "\n")
+    log_rows = []
+
+    # overlap H2D transfers with compute; grud moves its inputs internally
+    if device.type == "cuda" and model_type != "grud":
+        train_iter = CudaBatchPrefetcher(train_dataloader, device)
+    else:
+        train_iter = train_dataloader
 
     for epoch in range(epochs):
 
+        # reshuffle the bucket order; under DDP this also keeps the shards
+        # consistent across ranks
+        if hasattr(train_dataloader.batch_sampler, "set_epoch"):
+            train_dataloader.batch_sampler.set_epoch(epoch)
+
         # training step
         model.train().to(device)  # sets training mode
-        loss_list = []
-        for batch in tqdm.tqdm(train_dataloader, total=len(train_dataloader)):
+        running_loss = torch.zeros((), device=device)  # accumulate on device to avoid per-batch sync
+        for batch in tqdm.tqdm(train_iter, total=len(train_iter)):
             data, times, static, labels, mask, delta = batch
+            labels = labels.to(device, non_blocking=True)  # loss is computed on device
             if model_type != "grud":
-                data = data.to(device)
-                static = static.to(device)
-                times = times.to(device)
-                mask = mask.to(device)
-                delta = delta.to(device)
-            
-            optimizer.zero_grad()
+                data = data.to(device, non_blocking=True)
+                static = static.to(device, non_blocking=True)
+                times = times.to(device, non_blocking=True)
+                mask = mask.to(device, non_blocking=True)
+                delta = delta.to(device, non_blocking=True)
 
-            predictions = model(
-                x=data, static=static, time=times, sensor_mask=mask, delta=delta
-            )
-            if type(predictions) == tuple:
-                predictions, recon_loss = predictions
-            else:
-                recon_loss = 0
-            predictions = predictions.squeeze(-1)
-            loss = criterion(predictions.cpu(), labels) + recon_loss
-            loss_list.append(loss.item())
-            loss.backward()
-            optimizer.step()
-        accum_loss = np.mean(loss_list)
-
-        print("Loss is", accum_loss)
+            optimizer.zero_grad(set_to_none=True)  # skip the full-parameter memset
 
-        # validation step
-        model.eval().to(device)
-        labels_list = torch.LongTensor([])
-        predictions_list = torch.FloatTensor([])
-        with torch.no_grad():
-            for batch in val_dataloader:
-                data, times, static, labels, mask, delta = batch
-                labels_list = torch.cat((labels_list, labels), dim=0)
-                if model_type != "grud":
-                    data = data.to(device)
-                    static = static.to(device)
-                    times = times.to(device)
-                    mask = mask.to(device)
-                    delta = delta.to(device)
+            with torch.autocast(device_type="cuda", dtype=torch.bfloat16, enabled=use_amp):
                 predictions = model(
                     x=data, static=static, time=times, sensor_mask=mask, delta=delta
                 )
                 if type(predictions) == tuple:
-                    predictions, _ = predictions
+                    predictions, recon_loss = predictions
+                else:
+                    recon_loss = 0
                 predictions = predictions.squeeze(-1)
-                predictions_list = torch.cat(
-                    (predictions_list, predictions.cpu()), dim=0
-                )
-            print("Probs before softmax is", predictions_list)
-            probs = torch.nn.functional.softmax(predictions_list, dim=1)
-            print("probs is ", probs)
-            auc_score = metrics.roc_auc_score(labels_list, probs[:, 1])
-            aupr_score = metrics.average_precision_score(labels_list, probs[:, 1])
-
-        val_loss = criterion(predictions_list.cpu(), labels_list)
-
-        with open(f"{output_path}/training_log.csv", "a") as train_log:
-            train_log.write(
-                ",".join(map(str, [epoch + 1, accum_loss, val_loss.item(), auc_score]))
-                + "\n"
-            )
+                loss = criterion(predictions, labels.float()) + recon_loss
+            running_loss += loss.detach()
+            loss.backward()
+            optimizer.step()
+        accum_loss = (running_loss / len(train_dataloader)).item()  # single sync per epoch
 
-        print(f"Epoch: {epoch+1}, Train Loss: {accum_loss}, Val Loss: {val_loss}")
-
-        # set early stopping
-        if early_stop_criteria == "auroc":
-            early_stopping(1 - auc_score, model)
-        elif early_stop_criteria == "auprc":
-            early_stopping(1 - aupr_score, model)
-        elif early_stop_criteria == "auprc+auroc":
-            early_stopping(1 - (aupr_score + auc_score), model)
-        elif early_stop_criteria == "loss":
-            early_stopping(val_loss, model)
-
-        if early_stopping.early_stop:
-            print("Early stopping")
-            break
-
-    # save training curves
-    training_log = pd.read_csv(f"{output_path}/training_log.csv")
-    fig = plt.figure()
-    fig.suptitle("training curves")
-    ax0 = fig.add_subplot(121, title="loss")
-    ax0.plot(training_log["train_loss"], label="Training")
-    ax0.plot(training_log["val_loss"], label="Validation")
-    ax0.legend()
-    ax1 = fig.add_subplot(122, title="auroc")
-    ax1.plot(training_log["val_roc_auc_score"], label="Training")
-    ax1.legend()
-    fig.savefig(f"{output_path}/train_curves.jpg")
+        print("Loss is", accum_loss)
+
+        # validation step; with val_every > 1 most epochs skip it, but the
+        # last patience window always evaluates so early stopping still sees
+        # every candidate it could converge on
+        run_validation = epoch % val_every == 0 or epoch > epochs - patience - 1
+
+        if run_validation:
+            model.eval().to(device)
+            label_chunks = []
+            pred_chunks = []
+            with torch.no_grad():
+                for batch in val_dataloader:
+                    data, times, static, labels, mask, delta = batch
+                    label_chunks.append(labels)
+                    if model_type != "grud":
+                        data = data.to(device, non_blocking=True)
+                        static = static.to(device, non_blocking=True)
+                        times = times.to(device, non_blocking=True)
+                        mask = mask.to(device, non_blocking=True)
+                        delta = delta.to(device, non_blocking=True)
+                    predictions = model(
+                        x=data, static=static, time=times, sensor_mask=mask, delta=delta
+                    )
+                    if type(predictions) == tuple:
+                        predictions, _ = predictions
+                    predictions = predictions.squeeze(-1)
+                    pred_chunks.append(predictions)  # stays on device
+                # concatenate once instead of growing the tensor every batch
+                labels_list = torch.cat(label_chunks, dim=0)
+                predictions_list = torch.cat(pred_chunks, dim=0)
+                # only the positive-class probabilities cross to the host for sklearn
+                pos_probs_np = torch.sigmoid(predictions_list).cpu().numpy()
+                labels_np = labels_list.numpy()
+                auc_score = metrics.roc_auc_score(labels_np, pos_probs_np)
+                aupr_score = metrics.average_precision_score(labels_np, pos_probs_np)
+
+            val_loss = criterion(predictions_list, labels_list.to(device).float()).cpu()
+
+            log_rows.append([epoch + 1, accum_loss, val_loss.item(), auc_score])
+        else:
+            # keep the log aligned on skipped epochs
+            log_rows.append([epoch + 1, accum_loss, float("nan"), float("nan")])
+        if train_log:
+            train_log.write(",".join(map(str, log_rows[-1])) + "\n")
+            train_log.flush()  # keep the on-disk log current without reopening it
+
+        if run_validation:
+            print(f"Epoch: {epoch+1}, Train Loss: {accum_loss}, Val Loss: {val_loss}")
+
+            # set early stopping (rank 0 decides, the other ranks follow)
+            if is_main:
+                if early_stop_criteria == "auroc":
+                    early_stopping(1 - auc_score, model)
+                elif early_stop_criteria == "auprc":
+                    early_stopping(1 - aupr_score, model)
+                elif early_stop_criteria == "auprc+auroc":
+                    early_stopping(1 - (aupr_score + auc_score), model)
+                elif early_stop_criteria == "loss":
+                    early_stopping(val_loss, model)
+
+            should_stop = is_main and early_stopping.early_stop
+            if distributed:
+                stop_flag = torch.tensor(int(should_stop), device=device)
+                torch.distributed.broadcast(stop_flag, src=0)
+                should_stop = bool(stop_flag.item())
+
+            if should_stop:
+                print("Early stopping")
+                break
+        else:
+            print(f"Epoch: {epoch+1}, Train Loss: {accum_loss}")
+
+    if train_log:
+        train_log.close()
+
+    if is_main:
+        # save training curves (from the in-memory rows, no csv round-trip);
+        # matplotlib is only needed here, so import it lazily with the Agg
+        # backend to keep module import cheap and avoid any display probing
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        training_log = pd.DataFrame(log_rows, columns=log_columns)
+        fig = plt.figure()
+        fig.suptitle("training curves")
+        ax0 = fig.add_subplot(121, title="loss")
+        ax0.plot(training_log["train_loss"], label="Training")
+        ax0.plot(training_log["val_loss"], label="Validation")
+        ax0.legend()
+        ax1 = fig.add_subplot(122, title="auroc")
+        ax1.plot(training_log["val_roc_auc_score"], label="Training")
+        ax1.legend()
+        fig.savefig(f"{output_path}/train_curves.jpg")
 
     return val_loss, model
 
@@ -301,53 +489,69 @@ def test(
     **kwargs,
 ):
 
-    iterable_dataloader = iter(test_dataloader)
-    test_batch = next(iterable_dataloader)
-    max_seq_length = test_batch[0].shape[2]
-    sensor_count = test_batch[0].shape[1]
-    static_size = test_batch[2].shape[1]
-
-    criterion = nn.CrossEntropyLoss()
-    model.load_state_dict(
-        torch.load(f"{output_path}/checkpoint.pt")
-    )  # NEW: reload best model
+    criterion = nn.BCEWithLogitsLoss()
+
+    # under DDP only rank 0 writes the checkpoint; wait for the final save
+    # to be fully on disk before every rank loads it
+    distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+    if distributed:
+        torch.distributed.barrier()
+
+    # reload best model; mmap maps the tensors straight from disk and
+    # weights_only skips pickle's object-graph overhead (and its arbitrary
+    # code execution surface)
+    state = torch.load(
+        f"{output_path}/checkpoint.pt",
+        map_location=device,
+        mmap=True,
+        weights_only=True,
+    )
+    model.load_state_dict(state)
 
     model.eval().to(device)
 
-    labels_list = torch.LongTensor([])
-    predictions_list = torch.FloatTensor([])
+    label_chunks = []
+    pred_chunks = []
     with torch.no_grad():
         for batch in test_dataloader:
             data, times, static, labels, mask, delta = batch
-            labels_list = torch.cat((labels_list, labels), dim=0)
+            label_chunks.append(labels)
             if model_type != "grud":
-                data = data.to(device)
-                static = static.to(device)
-                times = times.to(device)
-                mask = mask.to(device)
-                delta = delta.to(device)
+                data = data.to(device, non_blocking=True)
+                static = static.to(device, non_blocking=True)
+                times = times.to(device, non_blocking=True)
+                mask = mask.to(device, non_blocking=True)
+                delta = delta.to(device, non_blocking=True)
             predictions = model(
                 x=data, static=static, time=times, sensor_mask=mask, delta=delta
             )
             if type(predictions) == tuple:
                 predictions, _ = predictions
             predictions = predictions.squeeze(-1)
-            predictions_list = torch.cat((predictions_list, predictions.cpu()), dim=0)
-    loss = criterion(predictions_list.cpu(), labels_list)
+            pred_chunks.append(predictions.cpu())
+    # concatenate once instead of growing the tensor every batch
+    labels_list = torch.cat(label_chunks, dim=0)
+    predictions_list = torch.cat(pred_chunks, dim=0)
+    loss = criterion(predictions_list.cpu(), labels_list.float())
     print(f"Test Loss: {loss}")
 
-    probs = torch.nn.functional.softmax(predictions_list, dim=1)
+    probs = torch.sigmoid(predictions_list)
+
+    # convert once so sklearn works on plain arrays rather than tensors
+    probs_np = probs.numpy()
+    labels_np = labels_list.numpy()
+    preds_np = (probs_np > 0.5).astype(int)  # hard predictions, computed once
 
     results = metrics.classification_report(
-        labels_list, torch.argmax(probs, dim=1), output_dict=True  # predictions_list
+        labels_np, preds_np, output_dict=True
     )
     cm = metrics.confusion_matrix(
-        labels_list, torch.argmax(probs, dim=1)
+        labels_np, preds_np
     )
 
-    auc_score = metrics.roc_auc_score(labels_list, probs[:, 1])
-    auprc_score = metrics.average_precision_score(labels_list, probs[:, 1])
-    accuracy_score = metrics.accuracy_score(labels_list, np.argmax(probs, axis=1))
+    auc_score = metrics.roc_auc_score(labels_np, probs_np)
+    auprc_score = metrics.average_precision_score(labels_np, probs_np)
+    accuracy_score = metrics.accuracy_score(labels_np, preds_np)
 
     print(results)
     print(cm)
@@ -364,7 +568,9 @@ def test(
     }
     test_metrics.update(results)
     # test_metrics.update(cm) # TO DO: add later
-    with open(f"{output_path}/test_results.json", "w") as fp:
-        json.dump(test_metrics, fp)
+    # every rank computes the same metrics; only rank 0 writes them out
+    if not distributed or torch.distributed.get_rank() == 0:
+        with open(f"{output_path}/test_results.json", "w") as fp:
+            json.dump(test_metrics, fp)
 
     return loss, accuracy_score, auprc_score, auc_score
@@ -4,7 +4,7 @@ import os  # Import the os module for interacting with the operating system
 import numpy as np  # Import the numpy module for numerical operations
 import tqdm  # Import the tqdm module for progress bars
 import torch  # Import the torch module for PyTorch operations
-from torch.utils.data import Dataset  # Import the Dataset class from PyTorch
+from torch.utils.data import Dataset, Sampler  # Import the Dataset and Sampler classes from PyTorch
 
 def truncate_to_longest_item_in_batch(data, times, mask, delta):
     """
@@ -146,6 +146,64 @@ def dataset_loader_splitter(dataset_id, base_path, split_index):
 
     return Ptrain, Pval, Ptest, norm_params
 
+class LengthBucketBatchSampler(Sampler):
+    '''A batch sampler that groups samples of similar sequence length into the same batch.
+    The datasets are zero padded to a global maximum length, but the collate functions
+    truncate each batch to its own longest member. Sorting the indices by the number of
+    actually observed time points before chunking them into batches keeps each batch's
+    effective length close to its longest member, so far fewer padded time points are
+    processed than when short and long stays end up in the same batch.
+    Attributes:
+        lengths (np.ndarray): Real sequence length of every sample in the dataset.
+        batch_size (int): Number of samples per batch.
+        shuffle (bool): Whether to shuffle the order of the batches each epoch.
+                        The batch contents stay length-sorted; only the bucket
+                        order varies between epochs.
+        num_replicas (int): Number of processes sharing the batches; like
+                            DistributedSampler, each rank gets every
+                            num_replicas-th batch of the (shared) epoch order.
+        rank (int): Index of this process among the replicas.
+        seed (int): Base seed for the per-epoch shuffle; combined with the
+                    epoch set via set_epoch() so all replicas agree on the
+                    same order while it still changes between epochs.'''
+
+    def __init__(self, lengths, batch_size, shuffle=False, num_replicas=1, rank=0, seed=0):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.epoch = 0
+        sorted_indices = np.argsort(self.lengths, kind="stable")
+        self.batches = [
+            sorted_indices[i:i + batch_size].tolist()
+            for i in range(0, len(sorted_indices), batch_size)
+        ]
+
+    def __len__(self):
+        # every replica yields the same (padded) number of batches
+        return -(-len(self.batches) // self.num_replicas)
+
+    def set_epoch(self, epoch):
+        """Makes each epoch reshuffle differently while keeping every replica in agreement."""
+        self.epoch = epoch
+
+    def __iter__(self):
+        if self.shuffle:
+            rng = np.random.RandomState(self.seed + self.epoch)
+            order = rng.permutation(len(self.batches))
+        else:
+            order = np.arange(len(self.batches))
+        # pad the epoch order by repeating batches, as DistributedSampler
+        # does, so every replica iterates the same count; an uneven split
+        # would leave one rank blocked in DDP's gradient all-reduce
+        total = len(self) * self.num_replicas
+        if total > len(order):
+            order = np.resize(order, total)  # repeats the order cyclically
+        for i in order[self.rank::self.num_replicas]:
+            yield self.batches[i]
+
 class PairedDataset(Dataset):
     '''A custom dataset class for handling paired positive and negative samples.
     This class is designed to manage two datasets: one containing positive samples 
@@ -189,6 +247,29 @@ class PairedDataset(Dataset):
         else:
             return len(self.dataset_pos)  # Length of positive samples dataset
 
+    @property
+    def max_seq_length(self):
+        return self.dataset_pos.max_seq_length
+
+    @property
+    def sensor_count(self):
+        return self.dataset_pos.sensor_count
+
+    @property
+    def static_size(self):
+        return self.dataset_pos.static_size
+
+    def sequence_lengths(self):
+        """Effective sequence length of each paired sample (max of its positive and negative member)."""
+        pos_lengths = self.dataset_pos.sequence_lengths()
+        neg_lengths = self.dataset_neg.sequence_lengths()
+        if self.neg_sample:
+            idx = np.arange(len(self.dataset_neg))
+            return np.maximum(neg_lengths, pos_lengths[idx % len(self.dataset_pos)])
+        else:
+            idx = np.arange(len(self.dataset_pos))
+            return np.maximum(pos_lengths, neg_lengths[idx % len(self.dataset_neg)])
+
     def _getitem_negative(self, idx):
         pos_data = self.dataset_pos[idx % len(self.dataset_pos)]  # Get positive sample # idx % len(self.dataset_pos) is used to ensure that the index is within the range of the positive dataset
         neg_data = self.dataset_neg[idx]  # Get negative sample
@@ -351,6 +432,22 @@ class MortalityDataset(Dataset):
     def __len__(self):
         return len(self.data_array)
 
+    @property
+    def max_seq_length(self):
+        return self.data_array.shape[2]  # data_array is (N, F, T)
+
+    @property
+    def sensor_count(self):
+        return self.data_array.shape[1]
+
+    @property
+    def static_size(self):
+        return self.static_array.shape[1]
+
+    def sequence_lengths(self):
+        """Number of time points with at least one observed feature, per sample."""
+        return (self.sensor_mask_array.sum(dim=1) > 0).sum(dim=1).numpy()
+
     def __getitem__(self, idx):
         return (
             self.data_array[idx],